@@ -0,0 +1,537 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+# =========================================================
+# BATCH MODE: COMPARE MANY WORKBOOK VERSIONS
+# =========================================================
+# Runs the Task 3 (optimal depth) and Task 4 (mineral selection)
+# models over every workbook in a directory or glob and writes one
+# consolidated table that diffs each version against a baseline.
+#
+# Each workbook is loaded and evaluated inside one worker process.
+# openpyxl parsing is pure Python and holds the GIL, so it would not
+# overlap on threads, and sending parsed sheets between processes costs
+# a pickle round trip. Wall time therefore grows with files / cores.
+# A workbook that fails to load or evaluate is reported and skipped.
+#
+# Usage:
+#   python batch_compare.py "C:\path\to\workbooks"
+#   python batch_compare.py "revisions/*.xlsx" -o batch_output.csv
+
+YEAR_MAP = {5: 2030, 10: 2035, 15: 2040}
+HORIZONS = [5, 10, 15]
+SHEETS = ["Composition", "Cost", "Market", "Refining Costs"]
+
+ORE_TONNAGE = 100000       # Task 3 ore assumption (matching task3.py)
+LOCATION = "Location A"    # Task 4 location (matching task4.py)
+ORE_GRID = list(range(50000, 1000001, 50000))
+MAX_MINERALS = 10
+
+name_map = {
+    "Lithium": "Lithium",
+    "Nickel (Million Tonnes)": "Nickel",
+    "Cobalt": "Cobalt",
+    "Graphite": "Graphite",
+    "Manganese": "Manganese",
+    "Copper (Million Tones)": "Copper",
+    "RareEarth": "RareEarth",
+    "Zinc": "Zinc",
+    "Tin": "Tin",
+    "Aluminum ('000 Mil tonnes)": "Aluminum",
+    "Iron ('000 mil ton)": "Iron",
+    "Lead": "Lead",
+    "Silver (per Kg)": "Silver",
+    "Gold (per Kg)": "Gold",
+    "Platinum (per Kg)": "Platinum",
+    "Phosphorus": "Phosphorus",
+    "Potash": "Potash",
+    "Silicon ('000 mil tons)": "Silicon",
+    "Germanium": "Germanium",
+    "Gallium": "Gallium",
+    "Antimony": "Antimony",
+    "Molybdenum": "Molybdenum",
+    "Vanadium": "Vanadium",
+    "Tungsten": "Tungsten",
+    "Selenium": "Selenium",
+    "Indium": "Indium",
+    "Tellurium": "Tellurium",
+    "Bismuth": "Bismuth",
+    "Cadmium": "Cadmium",
+    "Chromium": "Chromium"
+}
+
+rev_map = {v: k for k, v in name_map.items()}
+
+# =========================================================
+# LOAD EXCEL DATA
+# =========================================================
+
+def natural_key(path):
+    """Sort key that orders v2 before v10."""
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", path)]
+
+def find_workbooks(patterns):
+    """
+    Expand directories and glob patterns into a list of .xlsx files, in
+    the order the patterns were given and naturally sorted within each.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.xlsx")
+        for path in sorted(glob.glob(pattern), key=natural_key):
+            # Skip Excel lock files left behind by open workbooks
+            if os.path.basename(path).startswith("~$"):
+                continue
+            paths.append(os.path.abspath(path))
+    return list(dict.fromkeys(paths))
+
+def workbook_versions(paths):
+    """
+    Name each workbook by its path relative to the folder all inputs share,
+    without .xlsx, so e.g. q1/v1.xlsx and q2/v1.xlsx stay distinct.
+    """
+    if not paths:
+        return {}
+    try:
+        root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    except ValueError:
+        # Different drives on Windows: nothing in common, keep full paths
+        root = None
+    versions = {}
+    for p in paths:
+        name = os.path.relpath(p, root) if root else p
+        versions[p] = os.path.splitext(name)[0].replace(os.sep, "/")
+    return versions
+
+def read_workbook(path):
+    """Read the four input sheets of one workbook."""
+    xls = pd.ExcelFile(path)
+    return {sheet: pd.read_excel(xls, sheet) for sheet in SHEETS}
+
+# =========================================================
+# CLEAN INPUTS AND BUILD LOOKUPS
+# =========================================================
+
+def clean_sheet(df):
+    df = df.copy()
+    df["Location"] = df["Location"].ffill()
+    df = df[df["Location"].str.startswith("Location", na=False)]
+    df["Depth_km"] = pd.to_numeric(df["Depth_km"], errors="coerce")
+    df = df.dropna(subset=["Depth_km"])
+    return df
+
+def prepare_workbook(sheets):
+    """
+    Clean the raw sheets and index them by key.
+
+    task3.py / task4.py filter a DataFrame on every lookup; here each
+    (location, depth) and (mineral, year) row is resolved once up front,
+    keeping the first match just like the scripts' `.iloc[0]`.
+    """
+    comp = clean_sheet(sheets["Composition"])
+    cost = clean_sheet(sheets["Cost"])
+    market = sheets["Market"].copy()
+    refining = sheets["Refining Costs"]
+
+    market["gap"] = market["Demand ('000 Tonnes)"] - market["Supply ('000 Tonnes)"]
+    cost["mining_cost_per_ton"] = (
+        cost["Total Extraction Cost ('000 USD/ton)"] * 1000 +
+        cost["Manpower Cost (USD/ton)"]
+    )
+
+    top4 = (
+        market.groupby("Mineral")["gap"]
+              .mean()
+              .sort_values(ascending=False)
+              .head(4)
+              .index.tolist()
+    )
+
+    comp_rows = {}
+    for _, row in comp.iterrows():
+        comp_rows.setdefault((row["Location"], row["Depth_km"]), row)
+
+    mining_cost = {}
+    for _, row in cost.iterrows():
+        mining_cost.setdefault((row["Location"], row["Depth_km"]), row["mining_cost_per_ton"])
+
+    gap_dict = {}
+    for _, row in market.iterrows():
+        gap_dict.setdefault((row["Mineral"], row["Year"]), row["gap"])
+
+    price_dict = {
+        (row["Mineral"], int(row["Year"])): row["Price_USD_per_ton"]
+        for _, row in market.iterrows()
+    }
+
+    ref_cost_dict = dict(zip(refining["Unnamed: 0"], refining["Refining Cost (USD/Ton)"]))
+
+    # Logistics cost per ton of ore, keyed by number of minerals refined
+    logistics_map = {}
+    for _, row in cost[cost["Location"] == LOCATION].iterrows():
+        num_minerals = row.get("Number of minerals")
+        add_cost = row.get("Additional Cost ")
+        if pd.notna(num_minerals) and pd.notna(add_cost):
+            try:
+                if isinstance(add_cost, str):
+                    continue
+                logistics_map[int(num_minerals)] = float(add_cost) * 1000
+            except (TypeError, ValueError):
+                continue
+
+    return {
+        "top4_cols": [name_map[m] for m in top4],
+        "locations": sorted(comp["Location"].unique()),
+        "depths": sorted(comp["Depth_km"].unique()),
+        "comp_rows": comp_rows,
+        "mining_cost": mining_cost,
+        "gap": gap_dict,
+        "price": price_dict,
+        "ref_cost": ref_cost_dict,
+        "logistics": logistics_map,
+    }
+
+def get_gap_tons(wb, col, year):
+    return max(wb["gap"][(rev_map[col], year)] * 1000, 0)
+
+def get_logistics_cost(wb, num_minerals):
+    """Get logistics cost per ton of ore for given number of minerals."""
+    if num_minerals <= 0:
+        return 0.0
+    logistics_map = wb["logistics"]
+    keys = sorted(logistics_map.keys())
+    if num_minerals > keys[-1]:
+        return logistics_map[keys[-1]]
+    return logistics_map.get(num_minerals, 0.0)
+
+# =========================================================
+# TASK 3: PROFIT FOR ONE (LOCATION, DEPTH, HORIZON)
+# =========================================================
+
+def calc_profit(wb, location, depth, horizon):
+    year = YEAR_MAP[horizon]
+    key = (location, depth)
+    if key not in wb["comp_rows"] or key not in wb["mining_cost"]:
+        return -np.inf
+
+    c_row = wb["comp_rows"][key]
+    mining_cost_per_ton_ore = wb["mining_cost"][key]
+    total_profit = 0
+
+    for col in wb["top4_cols"]:
+        pct = c_row[col]
+        if pd.isna(pct) or pct <= 0:
+            continue
+
+        mass_metal = (pct / 100) * ORE_TONNAGE
+
+        gap_tons = get_gap_tons(wb, col, year)
+        if gap_tons == 0:
+            continue
+
+        effective_mass = min(mass_metal, gap_tons)
+        mining_cost_per_ton_metal = mining_cost_per_ton_ore / (pct / 100)
+        total_cost_per_ton = mining_cost_per_ton_metal + wb["ref_cost"][col]
+
+        price = wb["price"][(rev_map[col], year)]
+        total_profit += effective_mass * (price - total_cost_per_ton)
+
+    return total_profit
+
+def optimise_depths(wb):
+    """Best depth and profit for every (location, horizon)."""
+    best = {}
+    for loc in wb["locations"]:
+        for h in HORIZONS:
+            best_p = -np.inf
+            best_d = None
+            for d in wb["depths"]:
+                p = calc_profit(wb, loc, d, h)
+                if p > best_p:
+                    best_p = p
+                    best_d = d
+            best[(loc, h)] = (best_d, best_p)
+    return best
+
+# =========================================================
+# TASK 4: MINERAL SELECTION AND ORE QUANTITY
+# =========================================================
+
+def get_available_minerals(wb, year, depth):
+    c_row = wb["comp_rows"].get((LOCATION, depth))
+    if c_row is None:
+        return []
+
+    minerals = []
+    for col_name, market_name in rev_map.items():
+        if col_name not in c_row.index:
+            continue
+        pct = c_row[col_name]
+        if pd.isna(pct) or pct <= 0:
+            continue
+        gap = wb["gap"].get((market_name, year))
+        if gap is not None and gap > 0:
+            minerals.append(col_name)
+    return minerals
+
+def calculate_profit_for_minerals(wb, selected_minerals, ore_tonnage, horizon, depth):
+    """
+    Calculate profit for a set of selected minerals and ore tonnage.
+
+    Formula: Profit = Σ mass × (price - (mining_cost + refining_cost)) - logistics_cost
+    """
+    year = YEAR_MAP[horizon]
+    comp_row = wb["comp_rows"][(LOCATION, depth)]
+    mining_cost_per_ton_ore = wb["mining_cost"][(LOCATION, depth)]
+    total_profit = 0
+
+    logistics_total = get_logistics_cost(wb, len(selected_minerals)) * ore_tonnage
+
+    for col in selected_minerals:
+        pct = comp_row[col]
+        if pd.isna(pct) or pct <= 0:
+            continue
+
+        mass_metal = (pct / 100) * ore_tonnage
+
+        gap_tons = get_gap_tons(wb, col, year)
+        if gap_tons == 0:
+            continue
+
+        effective_mass = min(mass_metal, gap_tons)
+        mining_cost_per_ton_metal = mining_cost_per_ton_ore / (pct / 100)
+        total_cost_per_ton = mining_cost_per_ton_metal + wb["ref_cost"][col]
+
+        price = wb["price"][(rev_map[col], year)]
+        total_profit += effective_mass * (price - total_cost_per_ton)
+
+    total_profit -= logistics_total
+    return total_profit
+
+def rank_minerals_by_margin(wb, minerals, horizon, depth):
+    """Rank minerals by profit margin (price - cost per ton of metal)."""
+    year = YEAR_MAP[horizon]
+    comp_row = wb["comp_rows"][(LOCATION, depth)]
+    mining_cost_per_ton_ore = wb["mining_cost"][(LOCATION, depth)]
+    mineral_margins = []
+
+    for col in minerals:
+        pct = comp_row[col]
+        if pd.isna(pct) or pct <= 0:
+            continue
+
+        gap_tons = get_gap_tons(wb, col, year)
+        if gap_tons == 0:
+            continue
+
+        mining_cost_per_ton_metal = mining_cost_per_ton_ore / (pct / 100)
+        price = wb["price"][(rev_map[col], year)]
+        margin = price - (mining_cost_per_ton_metal + wb["ref_cost"][col])
+        mineral_margins.append({"mineral": col, "margin": margin})
+
+    mineral_margins.sort(key=lambda x: x["margin"], reverse=True)
+    return mineral_margins
+
+def optimise_minerals(wb, horizon, depth):
+    """Best (minerals, ore tonnage, profit) for Location A at one horizon."""
+    year = YEAR_MAP[horizon]
+    minerals = get_available_minerals(wb, year, depth)
+    if not minerals:
+        return None
+
+    ranked_minerals = rank_minerals_by_margin(wb, minerals, horizon, depth)
+
+    best_profit = -np.inf
+    best_minerals = []
+    best_ore_tonnage = 0
+
+    for num_minerals in range(1, min(len(ranked_minerals), MAX_MINERALS) + 1):
+        selected = [m["mineral"] for m in ranked_minerals[:num_minerals]]
+        for ore_tonnage in ORE_GRID:
+            profit = calculate_profit_for_minerals(wb, selected, ore_tonnage, horizon, depth)
+            if profit > best_profit:
+                best_profit = profit
+                best_minerals = selected.copy()
+                best_ore_tonnage = ore_tonnage
+
+    return best_minerals, best_ore_tonnage, best_profit
+
+# =========================================================
+# EVALUATE ONE WORKBOOK
+# =========================================================
+
+def evaluate_workbook(version, sheets):
+    """Run Task 3 and Task 4 for one workbook and return its result rows."""
+    wb = prepare_workbook(sheets)
+    best_depths = optimise_depths(wb)
+
+    rows = []
+    for h in HORIZONS:
+        for loc in wb["locations"]:
+            best_d, best_p = best_depths[(loc, h)]
+            row = {
+                "Version": version,
+                "Horizon": f"{h} yrs ({YEAR_MAP[h]})",
+                "Location": loc.replace("Location ", ""),
+                "Optimal Depth": best_d,
+                "Profit (B USD)": best_p / 1e9,
+                "Minerals Selected": None,
+                "Ore Tonnage (tons)": None,
+                "Selection Profit (B USD)": None,
+            }
+
+            # Task 4 only covers Location A, at its Task 3 optimal depth.
+            # task4.py reads that depth back from task3_output.csv, where it
+            # was written as whole km, so a 1.5 km optimum becomes a lookup
+            # at 1.0 km. Here the exact depth is used instead.
+            if loc == LOCATION and best_d is not None:
+                best = optimise_minerals(wb, h, best_d)
+                if best is not None:
+                    best_minerals, best_ore_tonnage, best_profit = best
+                    row["Minerals Selected"] = ", ".join(rev_map[m] for m in best_minerals)
+                    row["Ore Tonnage (tons)"] = best_ore_tonnage
+                    row["Selection Profit (B USD)"] = best_profit / 1e9
+
+            rows.append(row)
+    return rows
+
+# =========================================================
+# CONSOLIDATED DIFF TABLE
+# =========================================================
+
+COMPARE_COLS = ["Optimal Depth", "Minerals Selected", "Ore Tonnage (tons)"]
+PROFIT_COLS = ["Profit (B USD)", "Selection Profit (B USD)"]
+
+def format_depth(depth):
+    return f"{depth:g} km" if pd.notna(depth) else None
+
+def build_diff_table(rows, baseline, order=None):
+    """
+    One row per (horizon, location, version), diffed against the baseline version.
+
+    Within each (horizon, location) the baseline comes first, then the
+    other versions in `order` (default: order of first appearance).
+
+    Rows carry the raw optimal depth in km so sub-km moves are detected;
+    it is formatted only in the returned table.
+    """
+    base = {(r["Horizon"], r["Location"]): r for r in rows if r["Version"] == baseline}
+    present = {(r["Version"], r["Horizon"], r["Location"]) for r in rows}
+    versions = list(dict.fromkeys(r["Version"] for r in rows))
+
+    diffed = []
+    for r in rows:
+        r = dict(r)
+        b = base.get((r["Horizon"], r["Location"]))
+        if b is None:
+            r["Changed vs Baseline"] = "new"
+        else:
+            for col in PROFIT_COLS:
+                if pd.notna(r[col]) and pd.notna(b[col]):
+                    r[f"{col} Δ"] = r[col] - b[col]
+            diffs = [c for c in COMPARE_COLS if not (pd.isna(r[c]) and pd.isna(b[c])) and r[c] != b[c]]
+            r["Changed vs Baseline"] = ", ".join(diffs)
+        diffed.append(r)
+
+    # Cells the baseline has but a version no longer produces
+    for v in versions:
+        for h, loc in base:
+            if (v, h, loc) not in present:
+                diffed.append({"Version": v, "Horizon": h, "Location": loc,
+                               "Changed vs Baseline": "removed"})
+
+    columns = (["Version", "Horizon", "Location", "Optimal Depth", "Profit (B USD)",
+                "Minerals Selected", "Ore Tonnage (tons)", "Selection Profit (B USD)"] +
+               [f"{col} Δ" for col in PROFIT_COLS] + ["Changed vs Baseline"])
+    result = pd.DataFrame(diffed, columns=columns)
+    result["Optimal Depth"] = result["Optimal Depth"].map(format_depth)
+
+    order = list(dict.fromkeys([baseline] + list(order or []) + versions))
+    rank = {v: i for i, v in enumerate(order)}
+
+    result["H"] = result["Horizon"].map({f"{h} yrs ({YEAR_MAP[h]})": i for i, h in enumerate(HORIZONS)})
+    result["V"] = result["Version"].map(rank)
+    result = result.sort_values(["H", "Location", "V"], kind="stable").drop(columns=["H", "V"])
+    return result.reset_index(drop=True)
+
+# =========================================================
+# BATCH DRIVER
+# =========================================================
+
+def process_workbook(version, path):
+    """Load and evaluate one workbook; runs in a worker process."""
+    return evaluate_workbook(version, read_workbook(path))
+
+def run_batch(versions, workers=None):
+    """
+    Evaluate every {path: version} on a process pool.
+
+    Returns the result rows and a {path: error} dict for workbooks that
+    could not be read or evaluated; the rest of the batch carries on.
+    """
+    rows = []
+    failed = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_workbook, v, p): p for p, v in versions.items()}
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                rows.extend(fut.result())
+            except Exception as e:
+                failed[path] = e
+                continue
+            print(f"  Evaluated {versions[path]}")
+    return rows, failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare Task 3/4 results across workbook versions.")
+    parser.add_argument("inputs", nargs="+", help="workbook directories or glob patterns")
+    parser.add_argument("-o", "--output", default="batch_output.csv", help="consolidated CSV to write")
+    parser.add_argument("--baseline", help="version to diff against: path relative to the common "
+                                           "folder, without .xlsx (defaults to the first)")
+    parser.add_argument("--workers", type=int, default=None, help="evaluation processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.inputs)
+    if not paths:
+        print("No workbooks found.")
+        return 1
+
+    versions = workbook_versions(paths)
+    baseline = args.baseline or versions[paths[0]]
+    if baseline not in versions.values():
+        print(f"Baseline {baseline!r} not among: {', '.join(versions.values())}")
+        return 1
+
+    print(f"\nComparing {len(paths)} workbooks (baseline: {baseline})")
+    start = time.perf_counter()
+    rows, failed = run_batch(versions, workers=args.workers)
+    if not any(r["Version"] == baseline for r in rows):
+        print(f"Baseline {baseline!r} could not be evaluated.")
+        return 1
+    result = build_diff_table(rows, baseline, order=list(versions.values()))
+    elapsed = time.perf_counter() - start
+
+    print("\n==================== BATCH COMPARISON ====================\n")
+    print(result.to_string(index=False))
+    print("\n==========================================================\n")
+
+    result.to_csv(args.output, index=False)
+    print(f"Saved to {args.output} ({elapsed:.1f}s)\n")
+    if failed:
+        print(f"Skipped {len(failed)} workbook(s) that could not be evaluated:")
+        for path, e in sorted(failed.items()):
+            print(f"  {path}: {type(e).__name__}: {e}")
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# test_profit.py is a print-only hand check that needs the real workbook
+# next to it; run it directly with `python test_profit.py`.
+collect_ignore = ["test_profit.py"]
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+import batch_compare
+
+# =========================================================
+# SYNTHETIC WORKBOOKS FOR THE TESTS
+# =========================================================
+# Raw sheets shaped like "Deep Earth Mining Data.xlsx", shared by
+# test_engines.py and test_batch_compare.py.
+
+LOCATIONS = ["Location A", "Location B", "Location C"]
+YEARS = [2030, 2035, 2040]
+
+MARKET_NAMES = list(batch_compare.name_map.keys())
+MINERAL_COLS = list(batch_compare.name_map.values())
+
+def build_sheets(depths, comp_pct, extraction, manpower, additional,
+                 demand, supply, price, refining, duplicate=False):
+    """
+    Lay out raw sheets the way the real workbook does: Location only on
+    the first row of each block, plus a trailing note row to be cleaned.
+    With `duplicate`, the first Location A cell appears again with other
+    values; the scripts' `.iloc[0]` must keep the first.
+    """
+    comp_rows, cost_rows = [], []
+    i = 0
+    for loc in LOCATIONS:
+        for j, d in enumerate(depths):
+            first = loc if j == 0 else np.nan
+            comp_rows.append({"Location": first, "Depth_km": d,
+                              **dict(zip(MINERAL_COLS, comp_pct[i]))})
+            cost_rows.append({
+                "Location": first,
+                "Depth_km": d,
+                "Total Extraction Cost ('000 USD/ton)": extraction[i],
+                "Manpower Cost (USD/ton)": manpower[i],
+                "Number of minerals": j + 1,
+                "Additional Cost ": additional[i],
+            })
+            i += 1
+    if duplicate:
+        comp_rows.append({"Location": "Location A", "Depth_km": depths[0],
+                          **{col: 1.0 for col in MINERAL_COLS}})
+        cost_rows.append({"Location": "Location A", "Depth_km": depths[0],
+                          "Total Extraction Cost ('000 USD/ton)": 1.0,
+                          "Manpower Cost (USD/ton)": 1.0})
+    comp_rows.append({"Location": "Source: synthetic", "Depth_km": "-"})
+    cost_rows.append({"Location": "Source: synthetic", "Depth_km": "-"})
+
+    market_rows = []
+    k = 0
+    for mineral in MARKET_NAMES:
+        for year in YEARS:
+            market_rows.append({
+                "Mineral": mineral,
+                "Year": year,
+                "Demand ('000 Tonnes)": demand[k],
+                "Supply ('000 Tonnes)": supply[k],
+                "Price_USD_per_ton": price[k],
+            })
+            k += 1
+
+    return {
+        "Composition": pd.DataFrame(comp_rows),
+        "Cost": pd.DataFrame(cost_rows),
+        "Market": pd.DataFrame(market_rows),
+        "Refining Costs": pd.DataFrame({
+            "Unnamed: 0": MINERAL_COLS,
+            "Refining Cost (USD/Ton)": refining,
+        }),
+    }
+
+def random_sheets(seed, n_depths, offset=0.0):
+    """
+    Seeded workbook with every cell filled, for timing and batch runs.
+    Depths are offset, offset + 1, ... km.
+    """
+    rng = np.random.default_rng(seed)
+    n_cells = len(LOCATIONS) * n_depths
+    n_market = len(MARKET_NAMES) * len(YEARS)
+    return build_sheets(
+        depths=[offset + d for d in range(n_depths)],
+        comp_pct=rng.uniform(0, 10, (n_cells, len(MINERAL_COLS))).tolist(),
+        extraction=rng.uniform(0, 50, n_cells),
+        manpower=rng.uniform(0, 500, n_cells),
+        additional=rng.uniform(0, 5, n_cells),
+        demand=rng.uniform(0, 1000, n_market),
+        supply=rng.uniform(0, 1000, n_market),
+        price=rng.uniform(0, 1e6, n_market),
+        refining=rng.uniform(0, 1e5, len(MINERAL_COLS)),
+    )
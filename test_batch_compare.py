@@ -0,0 +1,177 @@
+import pandas as pd
+import pytest
+
+import batch_compare
+from synthetic_workbooks import random_sheets
+
+# =========================================================
+# HELPERS
+# =========================================================
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+    return str(path)
+
+def write_workbook(path, seed):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with pd.ExcelWriter(path) as writer:
+        for name, df in random_sheets(seed, n_depths=3).items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    return str(path)
+
+def row(version, location, depth, profit, minerals=None, ore=None, selection=None):
+    return {
+        "Version": version,
+        "Horizon": "5 yrs (2030)",
+        "Location": location,
+        "Optimal Depth": depth,
+        "Profit (B USD)": profit,
+        "Minerals Selected": minerals,
+        "Ore Tonnage (tons)": ore,
+        "Selection Profit (B USD)": selection,
+    }
+
+# =========================================================
+# FINDING WORKBOOKS
+# =========================================================
+
+def test_find_workbooks_expands_directories_and_globs(tmp_path):
+    v1 = touch(tmp_path / "q1" / "v1.xlsx")
+    v2 = touch(tmp_path / "q2" / "v2.xlsx")
+    touch(tmp_path / "q1" / "~$v1.xlsx")
+    touch(tmp_path / "q1" / "notes.txt")
+
+    assert batch_compare.find_workbooks([str(tmp_path / "q1")]) == [v1]
+    assert batch_compare.find_workbooks([str(tmp_path / "*" / "*.xlsx")]) == [v1, v2]
+    # The same file reached twice is listed once
+    assert batch_compare.find_workbooks([str(tmp_path / "q1"), v1]) == [v1]
+    assert batch_compare.find_workbooks([str(tmp_path / "missing")]) == []
+
+def test_find_workbooks_keeps_input_order_and_sorts_naturally(tmp_path):
+    v2 = touch(tmp_path / "q1" / "v2.xlsx")
+    v10 = touch(tmp_path / "q1" / "v10.xlsx")
+    later = touch(tmp_path / "q0" / "v1.xlsx")
+
+    assert batch_compare.find_workbooks([str(tmp_path / "q1")]) == [v2, v10]
+    assert batch_compare.find_workbooks([str(tmp_path / "q1"), str(tmp_path / "q0")]) == [v2, v10, later]
+
+def test_workbook_versions_keep_same_stems_apart(tmp_path):
+    a = str(tmp_path / "q1" / "v1.xlsx")
+    b = str(tmp_path / "q2" / "v1.xlsx")
+    assert batch_compare.workbook_versions([a, b]) == {a: "q1/v1", b: "q2/v1"}
+
+    c = str(tmp_path / "q1" / "v2.xlsx")
+    assert batch_compare.workbook_versions([a, c]) == {a: "v1", c: "v2"}
+
+# =========================================================
+# DIFF TABLE
+# =========================================================
+
+def test_build_diff_table_deltas_and_changes():
+    rows = [
+        row("v1", "A", 0.0, 1.0, "Lithium", 50000, 2.0),
+        row("v1", "B", 0.0, 3.0),
+        row("v2", "A", 0.0, 1.5, "Lithium, Cobalt", 50000, 1.0),
+        row("v2", "B", 2.0, 3.0),
+    ]
+    result = batch_compare.build_diff_table(rows, "v1").set_index(["Version", "Location"])
+
+    assert result.loc[("v1", "A"), "Changed vs Baseline"] == ""
+    assert result.loc[("v1", "A"), "Profit (B USD) Δ"] == 0.0
+
+    assert result.loc[("v2", "A"), "Changed vs Baseline"] == "Minerals Selected"
+    assert result.loc[("v2", "A"), "Profit (B USD) Δ"] == pytest.approx(0.5)
+    assert result.loc[("v2", "A"), "Selection Profit (B USD) Δ"] == pytest.approx(-1.0)
+
+    assert result.loc[("v2", "B"), "Changed vs Baseline"] == "Optimal Depth"
+    assert result.loc[("v2", "B"), "Profit (B USD) Δ"] == 0.0
+    assert pd.isna(result.loc[("v2", "B"), "Selection Profit (B USD) Δ"])
+
+def test_build_diff_table_detects_sub_km_depth_moves():
+    rows = [
+        row("v1", "A", 1.0, 1.0),
+        row("v2", "A", 1.5, 1.0),
+    ]
+    result = batch_compare.build_diff_table(rows, "v1").set_index("Version")
+
+    assert result.loc["v2", "Changed vs Baseline"] == "Optimal Depth"
+    assert list(result["Optimal Depth"]) == ["1 km", "1.5 km"]
+
+def test_build_diff_table_puts_baseline_first_then_input_order():
+    rows = [
+        row("v10", "A", 0.0, 1.0),
+        row("v2", "A", 0.0, 1.0),
+        row("v3", "A", 0.0, 1.0),
+    ]
+    result = batch_compare.build_diff_table(rows, "v3", order=["v2", "v3", "v10"])
+    assert list(result["Version"]) == ["v3", "v2", "v10"]
+
+    # Without an order, the rows' own order is kept after the baseline
+    result = batch_compare.build_diff_table(rows, "v3")
+    assert list(result["Version"]) == ["v3", "v10", "v2"]
+
+def test_build_diff_table_marks_new_and_removed_cells():
+    rows = [
+        row("v1", "A", 0.0, 1.0),
+        row("v1", "B", 0.0, 1.0),
+        row("v2", "A", 0.0, 1.0),
+        row("v2", "C", 1.0, 2.0),
+    ]
+    result = batch_compare.build_diff_table(rows, "v1")
+    changed = dict(zip(zip(result["Version"], result["Location"]), result["Changed vs Baseline"]))
+
+    assert changed[("v2", "C")] == "new"
+    assert changed[("v2", "B")] == "removed"
+    assert ("v1", "C") not in changed
+    assert len(result) == 5
+
+def test_build_diff_table_with_same_stems(tmp_path):
+    paths = [str(tmp_path / "q1" / "v1.xlsx"), str(tmp_path / "q2" / "v1.xlsx")]
+    versions = batch_compare.workbook_versions(paths)
+    rows = [
+        row(versions[paths[0]], "A", 0.0, 1.0),
+        row(versions[paths[1]], "A", 1.0, 2.0),
+    ]
+    result = batch_compare.build_diff_table(rows, "q1/v1").set_index("Version")
+
+    assert list(result.index) == ["q1/v1", "q2/v1"]
+    assert result.loc["q2/v1", "Changed vs Baseline"] == "Optimal Depth"
+    assert result.loc["q2/v1", "Profit (B USD) Δ"] == pytest.approx(1.0)
+
+# =========================================================
+# BATCH RUN
+# =========================================================
+
+def test_evaluate_workbook_covers_every_cell():
+    rows = batch_compare.evaluate_workbook("v1", random_sheets(seed=0, n_depths=3))
+
+    assert len(rows) == len(batch_compare.HORIZONS) * 3
+    for r in rows:
+        assert r["Version"] == "v1"
+        assert isinstance(r["Optimal Depth"], float)
+        # Task 4 only runs for Location A
+        assert (r["Ore Tonnage (tons)"] is not None) == (r["Location"] == "A")
+
+def test_run_batch_skips_unreadable_workbooks(tmp_path):
+    good = write_workbook(tmp_path / "q1" / "v1.xlsx", seed=0)
+    other = write_workbook(tmp_path / "q2" / "v1.xlsx", seed=1)
+    broken = str(tmp_path / "q2" / "broken.xlsx")
+    with open(broken, "w") as f:
+        f.write("not a workbook")
+
+    versions = batch_compare.workbook_versions([good, other, broken])
+    rows, failed = batch_compare.run_batch(versions, workers=2)
+
+    assert set(failed) == {broken}
+    assert {r["Version"] for r in rows} == {"q1/v1", "q2/v1"}
+
+def test_main_writes_consolidated_table(tmp_path):
+    write_workbook(tmp_path / "q1" / "v1.xlsx", seed=0)
+    write_workbook(tmp_path / "q2" / "v1.xlsx", seed=1)
+    output = str(tmp_path / "batch_output.csv")
+
+    assert batch_compare.main([str(tmp_path / "q1"), str(tmp_path / "q2"),
+                               "-o", output, "--workers", "2"]) == 0
+    result = pd.read_csv(output)
+    assert set(result["Version"]) == {"q1/v1", "q2/v1"}
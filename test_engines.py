@@ -0,0 +1,405 @@
+import os
+import ast
+import json
+import math
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+import pytest
+from hypothesis import given, example, settings, strategies as st, HealthCheck
+
+import batch_compare
+from synthetic_workbooks import (
+    LOCATIONS, YEARS, MARKET_NAMES, MINERAL_COLS, build_sheets, random_sheets,
+)
+
+# =========================================================
+# DIFFERENTIAL HARNESS: REFERENCE VS FAST ENGINES
+# =========================================================
+# The reference model is task3.py / task4.py themselves. Each script runs
+# top to bottom on a synthetic workbook. Only its Excel reads are replaced
+# by the synthetic sheets, and BASE_DIR points at a temporary folder, so
+# the scripts' own cleaning, lookups, loops and CSV handoff all execute.
+# Every fast engine must agree with them numerically and keep its
+# tracked speedup.
+#
+# A fast engine is a module exposing:
+#   prepare_workbook(sheets) -> wb  with "top4_cols" and "logistics"
+#   calc_profit(wb, location, depth, horizon)
+#   calculate_profit_for_minerals(wb, selected, ore_tonnage, horizon, depth)
+#   rank_minerals_by_margin(wb, minerals, horizon, depth)
+#   get_available_minerals(wb, year, depth)
+#   evaluate_workbook(version, sheets) -> rows, as in batch_compare
+#
+# Run:  python -m pytest -q
+# Refresh tracked speedups:  UPDATE_PERF_BASELINE=1 python -m pytest -q
+
+ENGINES = [batch_compare]
+
+REL_TOL = 1e-9
+ABS_TOL = 1e-3               # USD; profits run into the billions
+ABS_TOL_B = 1e-12            # same, for values in B USD
+PERF_TOLERANCE = 0.3         # fail if a speedup drops >30% below its tracked value
+MEASURE_ATTEMPTS = 3         # re-measure before failing; shared machines are noisy
+FAST_LOOPS = 50              # fast sweeps take milliseconds; loop them so timer noise averages out
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PERF_BASELINE_PATH = os.path.join(HERE, "perf_baseline.json")
+
+# =========================================================
+# RUN THE REFERENCE SCRIPTS
+# =========================================================
+
+LOAD_CALLS = {"ExcelFile", "read_excel"}
+SHEET_VARS = {"comp": "Composition", "cost": "Cost", "market": "Market", "refining": "Refining Costs"}
+
+def is_excel_load(node):
+    """True for BASE_DIR and the xls / read_excel statements of the LOAD EXCEL DATA section."""
+    if isinstance(node, ast.Assign) and any(
+        isinstance(t, ast.Name) and t.id == "BASE_DIR" for t in node.targets
+    ):
+        return True
+    return any(
+        isinstance(n, ast.Attribute) and n.attr in LOAD_CALLS for n in ast.walk(node)
+    )
+
+def assigns(node, name):
+    return isinstance(node, ast.Assign) and any(
+        isinstance(t, ast.Name) and t.id == name for t in node.targets
+    )
+
+def compile_script(script):
+    path = os.path.join(HERE, script)
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+
+    body = [node for node in tree.body if not is_excel_load(node)]
+    loads = len(tree.body) - len(body)
+    if loads != 2 + len(SHEET_VARS):
+        raise LookupError(f"{script}: expected BASE_DIR, xls and {len(SHEET_VARS)} sheet reads, "
+                          f"found {loads} load statements")
+    return path, body
+
+SCRIPTS = {name: compile_script(name) for name in ("task3.py", "task4.py")}
+
+def run_script(script, sheets, base_dir, until=None):
+    """
+    Execute a script against synthetic sheets and return its globals.
+
+    `until` stops before the first top-level assignment to that name,
+    e.g. before the optimisation loop when only the functions are needed.
+    """
+    path, body = SCRIPTS[script]
+    if until is not None:
+        stop = next(i for i, node in enumerate(body) if assigns(node, until))
+        body = body[:stop]
+
+    ns = {"__name__": "__reference__", "BASE_DIR": base_dir}
+    ns.update({var: sheets[sheet].copy() for var, sheet in SHEET_VARS.items()})
+    exec(compile(ast.Module(body=body, type_ignores=[]), path, "exec"), ns)
+    return ns
+
+def reference(script, sheets, until):
+    with tempfile.TemporaryDirectory() as base_dir:
+        return run_script(script, sheets, base_dir, until=until)
+
+# =========================================================
+# HYPOTHESIS WORKBOOKS
+# =========================================================
+
+def floats(lo, hi):
+    return st.floats(lo, hi, allow_nan=False, allow_infinity=False)
+
+@st.composite
+def workbooks(draw):
+    # Half-km steps, so Task 3 optima that task4.py would truncate do occur
+    depths = sorted(draw(st.sets(st.integers(0, 20).map(lambda d: d / 2), min_size=1, max_size=4)))
+    n_cells = len(LOCATIONS) * len(depths)
+    n_market = len(MARKET_NAMES) * len(YEARS)
+
+    pct = st.one_of(st.just(0.0), st.just(np.nan), floats(0.001, 10))
+    # Drawn as demand minus supply so a zero gap actually occurs
+    gap = st.one_of(st.just(0.0), floats(-500, 500))
+    demand = draw(st.lists(floats(500, 1000), min_size=n_market, max_size=n_market))
+    gaps = draw(st.lists(gap, min_size=n_market, max_size=n_market))
+    return build_sheets(
+        depths=depths,
+        comp_pct=draw(st.lists(st.lists(pct, min_size=len(MINERAL_COLS), max_size=len(MINERAL_COLS)),
+                               min_size=n_cells, max_size=n_cells)),
+        extraction=draw(st.lists(floats(0, 50), min_size=n_cells, max_size=n_cells)),
+        manpower=draw(st.lists(floats(0, 500), min_size=n_cells, max_size=n_cells)),
+        additional=draw(st.lists(floats(0, 5), min_size=n_cells, max_size=n_cells)),
+        demand=demand,
+        supply=[d - g for d, g in zip(demand, gaps)],
+        price=draw(st.lists(floats(0, 1e6), min_size=n_market, max_size=n_market)),
+        refining=draw(st.lists(floats(0, 1e5), min_size=len(MINERAL_COLS), max_size=len(MINERAL_COLS))),
+        duplicate=draw(st.booleans()),
+    )
+
+def assert_close(fast, ref, abs_tol=ABS_TOL):
+    if np.isinf(ref):
+        assert fast == ref
+    else:
+        assert math.isclose(fast, ref, rel_tol=REL_TOL, abs_tol=abs_tol), f"{fast!r} != {ref!r}"
+
+def depths_of(ref):
+    return sorted(ref["comp"]["Depth_km"].unique())
+
+SETTINGS = settings(max_examples=25, deadline=None,
+                    suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large])
+
+# =========================================================
+# DATA PREPARATION
+# =========================================================
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+@SETTINGS
+@given(sheets=workbooks())
+def test_prepared_lookups_match_reference(engine, sheets):
+    ref3 = reference("task3.py", sheets, until="rows")
+    ref4 = reference("task4.py", sheets, until="results")
+    wb = engine.prepare_workbook(sheets)
+
+    assert wb["top4_cols"] == ref3["top4_cols"]
+    assert wb["locations"] == ref3["locations"]
+    assert wb["depths"] == ref3["depths"]
+    assert wb["price"] == ref3["price_dict"]
+    assert wb["ref_cost"] == ref3["ref_cost_dict"]
+    assert wb["logistics"] == ref4["logistics_map"]
+
+# =========================================================
+# NUMERIC AGREEMENT
+# =========================================================
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+@SETTINGS
+@given(sheets=workbooks())
+def test_calc_profit_matches_reference(engine, sheets):
+    ref = reference("task3.py", sheets, until="rows")
+    wb = engine.prepare_workbook(sheets)
+
+    for loc in LOCATIONS:
+        for d in depths_of(ref):
+            for h in ref["YEAR_MAP"]:
+                assert_close(engine.calc_profit(wb, loc, d, h), ref["calc_profit"](loc, d, h))
+
+    # Cells missing from the workbook are infeasible in both
+    assert engine.calc_profit(wb, "Location A", 99.0, 5) == ref["calc_profit"]("Location A", 99.0, 5)
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+@SETTINGS
+@given(sheets=workbooks(), data=st.data())
+def test_calculate_profit_for_minerals_matches_reference(engine, sheets, data):
+    ref = reference("task4.py", sheets, until="results")
+    wb = engine.prepare_workbook(sheets)
+
+    for d in depths_of(ref):
+        for h in ref["YEAR_MAP"]:
+            selected = data.draw(st.lists(st.sampled_from(MINERAL_COLS), unique=True, max_size=12))
+            ore_tonnage = data.draw(st.sampled_from(batch_compare.ORE_GRID))
+            assert_close(
+                engine.calculate_profit_for_minerals(wb, selected, ore_tonnage, h, d),
+                ref["calculate_profit_for_minerals"](selected, ore_tonnage, h, d),
+            )
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+@SETTINGS
+@given(sheets=workbooks())
+def test_rank_minerals_matches_reference(engine, sheets):
+    ref = reference("task4.py", sheets, until="results")
+    wb = engine.prepare_workbook(sheets)
+
+    for d in depths_of(ref):
+        for h in ref["YEAR_MAP"]:
+            fast = engine.rank_minerals_by_margin(wb, MINERAL_COLS, h, d)
+            slow = ref["rank_minerals_by_margin"](MINERAL_COLS, h, d)
+            assert [m["mineral"] for m in fast] == [m["mineral"] for m in slow]
+            for f, s in zip(fast, slow):
+                assert_close(f["margin"], s["margin"])
+
+# =========================================================
+# END TO END: OPTIMAL DEPTHS, MINERAL SETS, TONNAGES, PROFITS
+# =========================================================
+
+def script_optimal_depths(ref3):
+    """Exact best depth per (location, horizon), using task3.py's own loop logic."""
+    best = {}
+    for loc in ref3["locations"]:
+        for h in ref3["YEAR_MAP"]:
+            best_p, best_d = -np.inf, None
+            for d in ref3["depths"]:
+                p = ref3["calc_profit"](loc, d, h)
+                if p > best_p:
+                    best_p, best_d = p, d
+            best[(loc, h)] = best_d
+    return best
+
+def hand_off_exact_depths(ref3, base_dir):
+    """
+    Rewrite task3_output.csv with exact depths instead of task3.py's
+    whole-km strings. batch_compare runs Task 4 at the exact depth by
+    design (see test_task4_handoff_truncates_fractional_depths).
+    """
+    best = script_optimal_depths(ref3)
+    path = os.path.join(base_dir, "task3_output.csv")
+    out = pd.read_csv(path)
+    for i, row in out.iterrows():
+        h = int(row["Horizon"].split()[0])
+        out.at[i, "Optimal Depth"] = f"{best[('Location ' + row['Location'], h)]:g} km"
+    out.to_csv(path, index=False)
+    return best
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+@settings(SETTINGS, max_examples=10)
+@given(sheets=workbooks())
+# Seeded workbook where every horizon selects the full 10 minerals
+@example(sheets=random_sheets(seed=1, n_depths=4))
+# Seeded workbook whose Location A optima are fractional
+@example(sheets=random_sheets(seed=3, n_depths=3, offset=0.5))
+def test_evaluate_workbook_matches_scripts(engine, sheets):
+    # task3.py writes task3_output.csv, which task4.py reads back for its depths
+    with tempfile.TemporaryDirectory() as base_dir:
+        ref3 = run_script("task3.py", sheets, base_dir)
+        best = hand_off_exact_depths(ref3, base_dir)
+        ref4 = run_script("task4.py", sheets, base_dir)
+
+    rows = {(r["Horizon"], r["Location"]): r for r in engine.evaluate_workbook("v", sheets)}
+    assert len(rows) == len(ref3["result"])
+
+    for _, expected in ref3["result"].iterrows():
+        r = rows[(expected["Horizon"], expected["Location"])]
+        h = int(expected["Horizon"].split()[0])
+        assert r["Optimal Depth"] == best[("Location " + expected["Location"], h)]
+        # task3.py displays the depth cut to whole km
+        assert f"{int(r['Optimal Depth'])} km" == expected["Optimal Depth"]
+        assert_close(r["Profit (B USD)"], expected["Profit (B USD)"], abs_tol=ABS_TOL_B)
+
+    wb = engine.prepare_workbook(sheets)
+    task4_rows = {r["Horizon"]: r for r in ref4["results"]}
+    for h, year in ref4["YEAR_MAP"].items():
+        horizon = f"{h} yrs ({year})"
+        depth = ref4["optimal_depths"][horizon]
+        assert engine.get_available_minerals(wb, year, depth) == ref4["available_minerals"][h]
+
+        r = rows[(horizon, "A")]
+        if horizon not in task4_rows:
+            assert r["Minerals Selected"] is None
+            continue
+        expected = task4_rows[horizon]
+        assert f"{int(r['Optimal Depth'])} km" == expected["Optimal Depth"]
+        assert r["Minerals Selected"] == expected["Minerals Selected"]
+        assert r["Ore Tonnage (tons)"] == expected["Ore Tonnage (tons)"]
+        assert_close(r["Selection Profit (B USD)"], expected["Profit (B USD)"], abs_tol=ABS_TOL_B)
+
+# =========================================================
+# DOCUMENTED DIFFERENCE: TASK 4 DEPTH HANDOFF
+# =========================================================
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+def test_task4_handoff_truncates_fractional_depths(engine):
+    """
+    Expected difference, documented in the README: with the scripts'
+    own handoff, task4.py looks up int(depth) and finds no row at
+    0/1/2 km here, so it selects nothing. The engine runs Task 4 at
+    the exact 0.5/1.5/2.5 km optimum and does select minerals.
+    """
+    sheets = random_sheets(seed=3, n_depths=3, offset=0.5)
+    with tempfile.TemporaryDirectory() as base_dir:
+        run_script("task3.py", sheets, base_dir)
+        ref4 = run_script("task4.py", sheets, base_dir)
+
+    assert set(ref4["optimal_depths"].values()) <= {0.0, 1.0, 2.0}
+    assert ref4["results"] == []
+
+    rows = [r for r in engine.evaluate_workbook("v", sheets) if r["Location"] == "A"]
+    assert {r["Optimal Depth"] for r in rows} <= {0.5, 1.5, 2.5}
+    assert all(r["Minerals Selected"] for r in rows)
+
+# =========================================================
+# SPEEDUP REGRESSION
+# =========================================================
+
+def best_time(fn, repeat=5, number=1):
+    """Best per-call time over `repeat` samples of `number` calls, as in timeit."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+def speedups(engine):
+    sheets = random_sheets(seed=0, n_depths=10)
+    ref3 = reference("task3.py", sheets, until="rows")
+    ref4 = reference("task4.py", sheets, until="results")
+    wb = engine.prepare_workbook(sheets)
+    depths = depths_of(ref3)
+    selected = MINERAL_COLS[:10]
+    ore_grid = batch_compare.ORE_GRID[::5]
+
+    def sweep3(profit):
+        for loc in LOCATIONS:
+            for d in depths:
+                for h in ref3["YEAR_MAP"]:
+                    profit(loc, d, h)
+
+    def sweep4(profit):
+        for d in depths[:5]:
+            for h in ref4["YEAR_MAP"]:
+                for ore_tonnage in ore_grid:
+                    profit(selected, ore_tonnage, h, d)
+
+    return {
+        "calc_profit": (
+            best_time(lambda: sweep3(ref3["calc_profit"])) /
+            best_time(lambda: sweep3(lambda *a: engine.calc_profit(wb, *a)), number=FAST_LOOPS)
+        ),
+        "calculate_profit_for_minerals": (
+            best_time(lambda: sweep4(ref4["calculate_profit_for_minerals"])) /
+            best_time(lambda: sweep4(lambda *a: engine.calculate_profit_for_minerals(wb, *a)), number=FAST_LOOPS)
+        ),
+    }
+
+@pytest.mark.parametrize("engine", ENGINES, ids=lambda m: m.__name__)
+def test_speedup_has_not_regressed(engine):
+    with open(PERF_BASELINE_PATH, encoding="utf-8") as f:
+        tracked = json.load(f)
+
+    if os.environ.get("UPDATE_PERF_BASELINE"):
+        measured = speedups(engine)
+        tracked[engine.__name__] = {
+            name: {"speedup": round(ratio, 1), "pandas": pd.__version__}
+            for name, ratio in measured.items()
+        }
+        with open(PERF_BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(tracked, f, indent=2)
+            f.write("\n")
+        pytest.skip(f"recorded speedups for {engine.__name__}: {tracked[engine.__name__]}")
+
+    assert engine.__name__ in tracked, f"no tracked speedup for {engine.__name__}; run with UPDATE_PERF_BASELINE=1"
+    entries = tracked[engine.__name__]
+
+    # The reference's cost is mostly pandas boolean-mask filtering, so a
+    # ratio recorded under another pandas version says nothing here
+    other = {e["pandas"] for e in entries.values()} - {pd.__version__}
+    if other:
+        pytest.skip(f"speedups for {engine.__name__} were recorded with pandas {', '.join(sorted(other))}, "
+                    f"installed is {pd.__version__}; re-record with UPDATE_PERF_BASELINE=1")
+
+    floors = {name: e["speedup"] * (1 - PERF_TOLERANCE) for name, e in entries.items()}
+    measured = speedups(engine)
+
+    # A real regression is slow on every attempt; a noisy machine is not
+    for _ in range(MEASURE_ATTEMPTS - 1):
+        if all(measured[name] >= floor for name, floor in floors.items()):
+            break
+        again = speedups(engine)
+        measured = {name: max(measured[name], again[name]) for name in measured}
+
+    for name, floor in floors.items():
+        assert measured[name] >= floor, (
+            f"{engine.__name__}.{name} speedup {measured[name]:.1f}x regressed from tracked "
+            f"{entries[name]['speedup']:.1f}x (best of {MEASURE_ATTEMPTS} attempts)"
+        )